@@ -1,3 +1,9 @@
+# Pillow-SIMD is a drop-in replacement for Pillow with SSE4/AVX2 versions of
+# ImageFilter.Kernel, and runs the filter below several times faster:
+#   pip uninstall pillow && pip install pillow-simd
+# No code changes are needed; `from PIL import ...` picks up whichever is
+# installed.
+
 import math
 import sys
 
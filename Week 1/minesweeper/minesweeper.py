@@ -1,5 +1,6 @@
 import itertools
 import random
+from collections import deque
 
 
 class Minesweeper():
@@ -10,18 +11,25 @@ class Minesweeper():
     def __init__(self, height=8, width=8, mines=8):
         self.height = height
         self.width = width
-        self.mines = set()
-
-        # Initialize an empty field with no mines
-        self.board = [[False for _ in range(self.width)] for _ in range(self.height)]
 
-        # Add mines randomly
-        while len(self.mines) < mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if (i, j) not in self.mines:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Initialize an empty field with no mines, stored row by row in one
+        # flat array so that cell (i, j) is at index i * width + j
+        self.board = bytearray(height * width)
+
+        # Add mines randomly, drawing distinct cells in one go
+        positions = random.sample(range(height * width), mines)
+        self.mines = {divmod(k, width) for k in positions}
+        for k in positions:
+            self.board[k] = 1
+
+        # Count each cell's neighboring mines once, by adding every mine to
+        # the counts of the cells around it
+        self.neighbor_counts = bytearray(height * width)
+        for mine_i, mine_j in self.mines:
+            for i in range(max(mine_i - 1, 0), min(mine_i + 2, self.height)):
+                for j in range(max(mine_j - 1, 0), min(mine_j + 2, self.width)):
+                    if (i, j) != (mine_i, mine_j):
+                        self.neighbor_counts[i * width + j] += 1
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -31,27 +39,21 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                print("|X" if self.board[i][j] else "| ", end="")
+                print("|X" if self.board[i * self.width + j] else "| ", end="")
             print("|")
         print("--" * self.width + "-")
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i * self.width + j])
 
     def nearby_mines(self, cell):
         """
         Returns the number of mines within one row and column of a given cell,
         not including the cell itself.
         """
-        count = 0
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-                if (i, j) == cell:
-                    continue
-                if 0 <= i < self.height and 0 <= j < self.width and self.board[i][j]:
-                    count += 1
-        return count
+        i, j = cell
+        return self.neighbor_counts[i * self.width + j]
 
     def won(self):
         """ Checks if all mines have been flagged. """
@@ -98,6 +100,44 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class MaskedSentence(Sentence):
+    """
+    Sentence that also keeps its cells as a bitmask, with cell (i, j) stored
+    at bit i * width + j of a board `width` cells wide.
+    Used by MinesweeperAI for fast subset tests between sentences.
+    """
+
+    def __init__(self, cells, count, width):
+        super().__init__(cells, count)
+        self.width = width
+        self.mask = 0
+        for i, j in self.cells:
+            self.mask |= 1 << (i * width + j)
+
+    @classmethod
+    def from_mask(cls, mask, count, width):
+        """ Builds a sentence from a cell bitmask instead of a set of cells. """
+        cells = set()
+        remaining = mask
+        while remaining:
+            bit = remaining & -remaining
+            cells.add(divmod(bit.bit_length() - 1, width))
+            remaining ^= bit
+        return cls(cells, count, width)
+
+    def mark_mine(self, cell):
+        """ Updates internal knowledge representation given the fact that a cell is known to be a mine. """
+        if cell in self.cells:
+            self.mask &= ~(1 << (cell[0] * self.width + cell[1]))
+        super().mark_mine(cell)
+
+    def mark_safe(self, cell):
+        """ Updates internal knowledge representation given the fact that a cell is known to be safe. """
+        if cell in self.cells:
+            self.mask &= ~(1 << (cell[0] * self.width + cell[1]))
+        super().mark_safe(cell)
+
+
 class MinesweeperAI():
     """
     Minesweeper game player.
@@ -111,17 +151,50 @@ class MinesweeperAI():
         self.safes = set()
         self.knowledge = []
 
+        # (mask, count) of every sentence in self.knowledge, and the sentences
+        # that are new or changed and still need to be checked for inferences
+        self._knowledge_keys = set()
+        self._pending = deque()
+
+        # Cells that are neither already chosen nor known to be mines
+        self._remaining = {(i, j) for i in range(height) for j in range(width)}
+
     def mark_mine(self, cell):
         """ Marks a cell as a mine, and updates all knowledge to mark that cell as a mine as well. """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self._remaining.discard(cell)
+        self._update_knowledge(cell, MaskedSentence.mark_mine)
 
     def mark_safe(self, cell):
         """ Marks a cell as safe, and updates all knowledge to mark that cell as safe as well. """
         self.safes.add(cell)
+        self._update_knowledge(cell, MaskedSentence.mark_safe)
+
+    def _update_knowledge(self, cell, mark):
+        """
+        Applies `mark` to every sentence containing `cell`. Changed sentences are
+        queued for inference again; those left empty or duplicated are dropped.
+        """
+        knowledge = []
         for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+            if cell in sentence.cells:
+                self._knowledge_keys.discard((sentence.mask, sentence.count))
+                mark(sentence, cell)
+                key = (sentence.mask, sentence.count)
+                if not sentence.cells or key in self._knowledge_keys:
+                    continue
+                self._knowledge_keys.add(key)
+                self._pending.append(sentence)
+            knowledge.append(sentence)
+        self.knowledge = knowledge
+
+    def _add_sentence(self, sentence):
+        """ Adds a sentence to the knowledge base unless it is empty or already known. """
+        key = (sentence.mask, sentence.count)
+        if sentence.cells and key not in self._knowledge_keys:
+            self._knowledge_keys.add(key)
+            self.knowledge.append(sentence)
+            self._pending.append(sentence)
 
     def add_knowledge(self, cell, count):
         """
@@ -129,6 +202,7 @@ class MinesweeperAI():
         how many neighboring cells have mines in them.
         """
         self.moves_made.add(cell)
+        self._remaining.discard(cell)
         self.mark_safe(cell)
 
         # Find all neighboring cells
@@ -143,39 +217,33 @@ class MinesweeperAI():
                     neighbors.add((i, j))
 
         # Add new sentence if not empty
-        if neighbors:
-            self.knowledge.append(Sentence(neighbors, count))
-
-        # Update knowledge
-        updated = True
-        while updated:
-            updated = False
-            new_knowledge = []
-            for sentence in self.knowledge:
-                safes = sentence.known_safes()
-                mines = sentence.known_mines()
-
-                if safes:
-                    for safe in safes.copy():
-                        self.mark_safe(safe)
-                    updated = True
-
-                if mines:
-                    for mine in mines.copy():
-                        self.mark_mine(mine)
-                    updated = True
+        self._add_sentence(MaskedSentence(neighbors, count, self.width))
 
-            # Infer new sentences
-            knowledge_copy = self.knowledge[:]
-            for sentence1 in knowledge_copy:
-                for sentence2 in knowledge_copy:
-                    if sentence1 != sentence2 and sentence1.cells.issubset(sentence2.cells):
-                        new_sentence = Sentence(sentence2.cells - sentence1.cells, sentence2.count - sentence1.count)
-                        if new_sentence not in self.knowledge and len(new_sentence.cells) > 0:
-                            new_knowledge.append(new_sentence)
-                            updated = True
+        # Update knowledge, only pairing new or changed sentences with the rest
+        while self._pending:
+            sentence = self._pending.popleft()
+            if (sentence.mask, sentence.count) not in self._knowledge_keys:
+                continue  # dropped since it was queued
 
-            self.knowledge.extend(new_knowledge)
+            for mine in sentence.known_mines():
+                self.mark_mine(mine)
+            for safe in sentence.known_safes():
+                self.mark_safe(safe)
+            if not sentence.cells:
+                continue
+
+            # Infer new sentences
+            for other in tuple(self.knowledge):
+                if other is sentence:
+                    continue
+                if sentence.mask & other.mask == sentence.mask:
+                    self._add_sentence(MaskedSentence.from_mask(
+                        other.mask & ~sentence.mask, other.count - sentence.count, self.width
+                    ))
+                elif sentence.mask & other.mask == other.mask:
+                    self._add_sentence(MaskedSentence.from_mask(
+                        sentence.mask & ~other.mask, sentence.count - other.count, self.width
+                    ))
 
     def make_safe_move(self):
         """ Returns a safe cell to choose on the Minesweeper board. """
@@ -184,7 +252,4 @@ class MinesweeperAI():
 
     def make_random_move(self):
         """ Returns a move to make on the Minesweeper board. """
-        all_possible_moves = {
-            (i, j) for i in range(self.height) for j in range(self.width)
-        } - self.moves_made - self.mines
-        return random.choice(tuple(all_possible_moves)) if all_possible_moves else None
\ No newline at end of file
+        return random.choice(tuple(self._remaining)) if self._remaining else None
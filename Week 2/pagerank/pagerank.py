@@ -2,9 +2,11 @@ import os
 import random
 import re
 import sys
+from operator import mul, sub
 
 DAMPING = 0.85
 SAMPLES = 10000
+LINK_PATTERN = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
 
 
 def main():
@@ -28,22 +30,19 @@ def crawl(directory):
     a list of all other pages in the corpus that are linked to by the page.
     """
     pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
+    filenames = [
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    ]
+    corpus = set(filenames)
+
+    # Extract all links from HTML files, keeping only links to other pages
+    # in the corpus
+    for filename in filenames:
         with open(os.path.join(directory, filename)) as f:
             contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
-
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
+            links = LINK_PATTERN.findall(contents)
+            pages[filename] = (set(links) & corpus) - {filename}
 
     return pages
 
@@ -80,18 +79,26 @@ def sample_pagerank(corpus, damping_factor, n):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    counts = {page: 0 for page in corpus}
-    sample_page = random.choice(list(corpus.keys()))
-    counts[sample_page] += 1
+    pages = tuple(corpus)
+    N = len(pages)
+    index = {page: k for k, page in enumerate(pages)}
+    links = [tuple(index[link] for link in corpus[page]) for page in pages]
+
+    counts = [0] * N
+    k = random.randrange(N)
+    counts[k] += 1
     for _ in range(n-1):
-        pd = transition_model(corpus, sample_page, damping_factor)
-        sample_page = random.choices(list(pd.keys()), weights=pd.values(), k=1)[0]
-        counts[sample_page] += 1
-    #print("Fuck you!!!")
-    for page in counts:
-        counts[page] /= n
+        # Draw from the transition model without building it: with probability
+        # `damping_factor` follow one of the page's links, otherwise (or if it
+        # has none) move to any page in the corpus
+        page_links = links[k]
+        if page_links and random.random() < damping_factor:
+            k = random.choice(page_links)
+        else:
+            k = random.randrange(N)
+        counts[k] += 1
 
-    return counts
+    return {page: count / n for page, count in zip(pages, counts)}
 
 
 def iterate_pagerank(corpus, damping_factor):
@@ -105,30 +112,57 @@ def iterate_pagerank(corpus, damping_factor):
     """
 
     threshold = 0.001
-    pd = dict()
-    for p in corpus:
-        pd[p] = 1/len(corpus)  # initial rank for all pages
-    while True:
-        new_pd = dict()
-        for page in corpus:
-            new_pd[page] = (1 - damping_factor) / len(corpus)
+    pages = list(corpus)
+    N = len(pages)
+    index = {page: k for k, page in enumerate(pages)}
+
+    # Build the link structure once: for each page, the indices of the pages
+    # linking to it and the share of rank each of them passes along. Pages
+    # with no links are treated as linking to every page, so they are kept
+    # apart.
+    incoming = [([], []) for _ in range(N)]
+    dangling = []
+    for page in pages:
+        links = corpus[page]
+        if not links:
+            dangling.append(index[page])
+            continue
+        weight = damping_factor / len(links)
+        for link in links:
+            sources, weights = incoming[index[link]]
+            sources.append(index[page])
+            weights.append(weight)
+
+    pd = power_iterate(incoming, dangling, damping_factor, threshold)
+    return {page: pd[index[page]] for page in pages}
 
-            # Handling pages with no links as linking to all pages
-            for linking_page in corpus:
-                if not corpus[linking_page]:
-                    new_pd[page] += damping_factor * pd[linking_page] / len(corpus)
-                elif page in corpus[linking_page]:
-                    new_pd[page] += damping_factor * pd[linking_page] / len(corpus[linking_page])
+
+def power_iterate(incoming, dangling, damping_factor, threshold):
+    """
+    Run the PageRank power iteration over pages numbered 0 to N-1.
+
+    `incoming[k]` is a pair of parallel lists: the pages linking to page k
+    and the weight (damping factor / outdegree) of each of those links.
+    `dangling` lists the pages without links. Return the list of ranks.
+    """
+    N = len(incoming)
+    pd = [1/N] * N  # initial rank for all pages
+    teleport = (1 - damping_factor) / N
+    spread = damping_factor / N
+    while True:
+        base = teleport + spread * sum([pd[k] for k in dangling])
+        new_pd = [
+            base + sum(map(mul, [pd[k] for k in sources], weights))
+            for sources, weights in incoming
+        ]
 
         # Convergence check
-        diff = max(abs(new_pd[page] - pd[page]) for page in pd)
+        diff = max(map(abs, map(sub, new_pd, pd)))
         if diff < threshold:
-            break
+            return pd
 
         pd = new_pd
 
-    return pd
-
 
 if __name__ == "__main__":
     main()
@@ -1,4 +1,5 @@
 import sys
+from collections import Counter, defaultdict, deque
 
 from crossword import *
 
@@ -14,6 +15,23 @@ class CrosswordCreator():
             var: self.crossword.words.copy()
             for var in self.crossword.variables
         }
+        self._neighbors = {
+            var: frozenset(self.crossword.neighbors(var))
+            for var in self.crossword.variables
+        }
+        self._words_by_length = defaultdict(set)
+        for word in self.crossword.words:
+            self._words_by_length[len(word)].add(word)
+
+        # For each variable, its neighbors together with the overlapping
+        # positions (i in the variable, j in the neighbor)
+        self._overlapping = {
+            var: tuple(
+                (neighbor, *self.crossword.overlaps[var, neighbor])
+                for neighbor in self._neighbors[var]
+            )
+            for var in self.crossword.variables
+        }
 
 
     def letter_grid(self, assignment):
@@ -24,12 +42,10 @@ class CrosswordCreator():
             [None for _ in range(self.crossword.width)]
             for _ in range(self.crossword.height)
         ]
+        # Variable.cells already holds the (i, j) square of each letter
         for variable, word in assignment.items():
-            direction = variable.direction
-            for k in range(len(word)):
-                i = variable.i + (k if direction == Variable.DOWN else 0)
-                j = variable.j + (k if direction == Variable.ACROSS else 0)
-                letters[i][j] = word[k]
+            for (i, j), letter in zip(variable.cells, word):
+                letters[i][j] = letter
         return letters
 
     def print(self, assignment):
@@ -100,14 +116,13 @@ class CrosswordCreator():
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
         """
+        # Intersecting with the bucket of words of the right length only
+        # iterates over the smaller of the two sets
         for variable in self.domains:
-            removed_words = set()
-            for word in self.domains[variable]:
-                if len(word) != variable.length:
-                    removed_words.add(word)
-            for words in removed_words:
-                self.domains[variable].remove(words)
-                
+            self.domains[variable] = (
+                self.domains[variable] & self._words_by_length[variable.length]
+            )
+
 
     def revise(self, x, y):
         """
@@ -130,13 +145,11 @@ class CrosswordCreator():
 
         to_remove = set()
 
+        # Letters that some value of y can put in the overlapping square
+        y_letters = {y_val[y_index] for y_val in self.domains[y]}
+
         for x_val in self.domains[x]:
-            satisfies = False
-            for y_val in self.domains[y]:
-                if x_val[x_index] == y_val[y_index]:
-                    satisfies = True
-                    break
-            if not satisfies:
+            if x_val[x_index] not in y_letters:
                 to_remove.add(x_val)
                 revised = True
 
@@ -158,14 +171,16 @@ class CrosswordCreator():
         """
         # Initialize arcs
         if arcs is None:
-            arcs = list(self.crossword.overlaps)
+            arcs = deque(self.crossword.overlaps)
+        else:
+            arcs = deque(arcs)
 
         while arcs:
-            x, y = arcs.pop(0)
+            x, y = arcs.popleft()
             if self.revise(x, y):
                 if len(self.domains[x]) == 0:
                     return False
-                for neighbor in self.crossword.neighbors(x) - {y}:
+                for neighbor in self._neighbors[x] - {y}:
                     arcs.append((neighbor, x))
         return True
 
@@ -190,22 +205,16 @@ class CrosswordCreator():
         if len(values) != len(set(values)):
             return False  # duplicate words found
 
-        for var in assignment:
-            word = assignment[var]
-
         # Check correct length
+        for var, word in assignment.items():
             if len(word) != var.length:
                 return False
 
         # Check for conflicts with overlapping variables
-            for other in assignment:
-                if var == other:
-                    continue
-                overlap = self.crossword.overlaps.get((var, other))
-                if overlap:
-                    i, j = overlap
-                    if word[i] != assignment[other][j]:
-                        return False
+        for var, word in assignment.items():
+            for neighbor, i, j in self._overlapping[var]:
+                if neighbor in assignment and word[i] != assignment[neighbor][j]:
+                    return False
 
         return True
 
@@ -217,30 +226,28 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        return_value = dict()
         values = self.domains[var]
-        neighbors = self.crossword.neighbors(var)
-
-        for value in values:
-            count = 0
-            for neighbor in neighbors:
-                if neighbor in assignment:
-                    continue
 
-                overlap = self.crossword.overlaps.get((var, neighbor))
-                if overlap is None:
-                    continue
-
-                i, j = overlap
-                for neighbor_val in self.domains[neighbor]:
-                    if value[i] != neighbor_val[j]:
-                        count += 1
+        # For each unassigned neighbor, count how many of its remaining words
+        # have each letter at the overlapping square
+        letter_counts = []
+        for neighbor, i, j in self._overlapping[var]:
+            if neighbor in assignment:
+                continue
+            domain = self.domains[neighbor]
+            letter_counts.append(
+                (i, len(domain), Counter(neighbor_val[j] for neighbor_val in domain))
+            )
 
-            return_value[value] = count
+        # A value rules out every neighbor word without its letter at the overlap
+        return_value = dict()
+        for value in values:
+            return_value[value] = sum(
+                size - counts[value[i]] for i, size, counts in letter_counts
+            )
 
-    
         return sorted(values, key=lambda v: return_value[v])
-        
+
 
     def select_unassigned_variable(self, assignment):
         """
@@ -267,35 +274,65 @@ class CrosswordCreator():
         if len(min_vars) == 1:
             return min_vars[0]
         else:
-            return max(min_vars, key = lambda var: len(self.crossword.neighbors(var)))
+            return max(min_vars, key = lambda var: len(self._neighbors[var]))
 
 
-    def backtrack(self, assignment):
+    def backtrack(self, assignment, used_words=None):
         """
         Using Backtracking Search, take as input a partial assignment for the
         crossword and return a complete assignment if possible to do so.
 
         `assignment` is a mapping from variables (keys) to words (values).
+        It is extended in place, and restored if the search fails.
+        `used_words` is the set of words already in `assignment`.
 
         If no assignment is possible, return None.
         """
+        if used_words is None:
+            used_words = set(assignment.values())
+
         if self.assignment_complete(assignment):
             return assignment
-        else:
-            new_var = self.select_unassigned_variable(assignment)
-            for value in self.order_domain_values(new_var, assignment):
-                new_assignment = assignment.copy()
-                new_assignment[new_var] = value
 
-                if self.consistent(new_assignment):
-                    result = self.backtrack(new_assignment)
+        new_var = self.select_unassigned_variable(assignment)
+        for value in self.order_domain_values(new_var, assignment):
+            if not self.consistent_extension(assignment, used_words, new_var, value):
+                continue
+
+            assignment[new_var] = value
+            used_words.add(value)
+
+            # Maintain arc consistency: shrink the domains of the neighbors to
+            # fit the new value, and only recurse if none of them empties
+            saved_domains = {var: words.copy() for var, words in self.domains.items()}
+            self.domains[new_var] = {value}
+            arcs = [(neighbor, new_var) for neighbor in self._neighbors[new_var]
+                    if neighbor not in assignment]
+            if self.ac3(arcs):
+                result = self.backtrack(assignment, used_words)
+                if result is not None:
+                    return result
+
+            self.domains = saved_domains
+            del assignment[new_var]
+            used_words.remove(value)
 
-                    if result is not None:
-                        return result
         return None
 
- 
-        
+    def consistent_extension(self, assignment, used_words, var, value):
+        """
+        Return True if adding `var` = `value` to the consistent `assignment`
+        keeps it consistent. Only the constraints involving `var` can be
+        broken, so only those are checked.
+        """
+        if value in used_words or len(value) != var.length:
+            return False
+
+        for neighbor, i, j in self._overlapping[var]:
+            if neighbor in assignment and value[i] != assignment[neighbor][j]:
+                return False
+
+        return True
 
 
 def main():